@@ -18,14 +18,135 @@ Repository: https://github.com/agent-hanju/char-index-mcp
 """
 
 from mcp.server.fastmcp import FastMCP
+import functools
 import re
+from collections import Counter
 from typing import Annotated
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+
 mcp = FastMCP("char-index")
 
 
+# Constructs that RE2 either rejects or interprets differently from
+# stdlib re: \w/\d/\s/\b and friends are ASCII-only in RE2, '$' does not
+# match before a trailing newline, POSIX classes like [[:alpha:]] are
+# live syntax instead of a literal bracket set, and Python-only syntax
+# (backreferences, lookaround, \u/\N escapes) is rejected. Every (?...)
+# group except plain (?: is screened conservatively, since inline flags
+# also shift semantics between engines ((?i) case folding, (?m) trailing
+# empty matches). Patterns containing any of these always compile with
+# stdlib re, so only patterns restricted to literals, ordinary classes,
+# quantifiers, alternation, and (?: groups ever run on RE2.
+_RE2_DIVERGENT = re.compile(
+    r"\\[wWdDsSbBZuUN0-9]"  # ASCII-only classes/boundaries, backrefs, escapes
+    r"|\$"                  # '$' excludes a trailing newline in RE2
+    r"|\(\?(?!:)"           # inline flags, lookaround, named groups, comments
+    r"|\[\[:"               # POSIX character classes
+    r"|[*+?}]\+"            # possessive quantifiers (Python 3.11+)
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str):
+    """Compile a regex pattern, caching compiled objects across calls.
+
+    Uses google-re2's linear-time engine when installed, but only for
+    patterns that mean the same thing under both engines; anything else
+    compiles with stdlib re so matches are engine-independent.
+    """
+    # Validate with stdlib first: invalid patterns raise re.error here
+    # and never reach re2.compile (whose absl logger writes to stderr).
+    regex = re.compile(pattern)
+
+    if re2 is not None and not _RE2_DIVERGENT.search(pattern):
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            pass
+
+    return regex
+
+
+@functools.lru_cache(maxsize=64)
+def _build_automaton(patterns: tuple[str, ...]) -> "ahocorasick.Automaton":
+    """Build an Aho-Corasick automaton, caching it across calls."""
+    automaton = ahocorasick.Automaton()
+    for pattern in patterns:
+        automaton.add_word(pattern, pattern)
+    automaton.make_automaton()
+    return automaton
+
+
+# Classification tags for the ASCII lookup table below. _CLASS_NUMERIC
+# covers characters that are alphanumeric but neither letters nor digits
+# (e.g. Roman numerals), which count toward no class but the totals.
+_CLASS_WS, _CLASS_LETTER, _CLASS_DIGIT, _CLASS_OTHER, _CLASS_NUMERIC = 1, 2, 3, 4, 5
+
+# 256-entry table mapping each ASCII byte to its class tag, so a single
+# bytes.translate pass classifies a whole text in C. Bytes >= 128 never
+# occur in the ASCII-only inputs this table is applied to.
+_ASCII_CLASS_TABLE = bytes(
+    _CLASS_WS if chr(i).isspace()
+    else _CLASS_LETTER if chr(i).isalpha()
+    else _CLASS_DIGIT if chr(i).isdigit()
+    else _CLASS_OTHER
+    for i in range(128)
+) + bytes(128)
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify(char: str) -> int:
+    """Classify a single character, caching the verdict across calls."""
+    if char.isspace():
+        return _CLASS_WS
+    if char.isalpha():
+        return _CLASS_LETTER
+    if char.isdigit():
+        return _CLASS_DIGIT
+    if char.isalnum():
+        return _CLASS_NUMERIC
+    return _CLASS_OTHER
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _count_ascii(buf):
+        """Count char classes over a uint8 buffer in one native-code pass."""
+        whitespace = letters = digits = special = plain_spaces = 0
+        for b in buf:
+            if b == 32:
+                whitespace += 1
+                plain_spaces += 1
+            elif 9 <= b <= 13 or 28 <= b <= 31:
+                whitespace += 1
+            elif 65 <= b <= 90 or 97 <= b <= 122:
+                letters += 1
+            elif 48 <= b <= 57:
+                digits += 1
+            else:
+                special += 1
+        return whitespace, letters, digits, special, plain_spaces
+else:
+    _count_ascii = None
+
+
 # ========================================
-# 1. Character & Substring Finding (4)
+# 1. Character & Substring Finding (5)
 # ========================================
 
 @mcp.tool()
@@ -39,14 +160,14 @@ def find_nth_char(
         raise ValueError("char must be a single character")
     if n < 1:
         raise ValueError("n must be >= 1")
-    
-    count = 0
-    for i, c in enumerate(text):
-        if c == char:
-            count += 1
-            if count == n:
-                return i
-    return -1
+
+    start = 0
+    for _ in range(n):
+        index = text.find(char, start)
+        if index == -1:
+            return -1
+        start = index + 1
+    return start - 1
 
 
 @mcp.tool()
@@ -57,8 +178,19 @@ def find_all_char_indices(
     """Find all indices where a character appears. Returns empty list if not found."""
     if len(char) != 1:
         raise ValueError("char must be a single character")
-    
-    return [i for i, c in enumerate(text) if c == char]
+
+    indices = []
+    append = indices.append
+    start = 0
+
+    while True:
+        index = text.find(char, start)
+        if index == -1:
+            break
+        append(index)
+        start = index + 1
+
+    return indices
 
 
 @mcp.tool()
@@ -67,49 +199,87 @@ def find_nth_substring(
     substring: Annotated[str, "Substring to find"],
     n: Annotated[int, "Which occurrence to find (1-based)"] = 1
 ) -> int:
-    """Find starting index of nth occurrence of a substring. Returns -1 if not found."""
+    """Find starting index of nth non-overlapping occurrence of a substring. Returns -1 if not found."""
     if not substring:
         raise ValueError("substring cannot be empty")
     if n < 1:
         raise ValueError("n must be >= 1")
-    
+
+    # Single characters skip the substring matcher's setup cost
+    if len(substring) == 1:
+        return find_nth_char(text, substring, n)
+
     count = 0
     start = 0
-    
+    step = len(substring)
+
     while True:
         index = text.find(substring, start)
         if index == -1:
             return -1
-        
+
         count += 1
         if count == n:
             return index
-        
-        start = index + 1
+
+        start = index + step
 
 
 @mcp.tool()
 def find_all_substring_indices(
     text: Annotated[str, "Text to search in"],
-    substring: Annotated[str, "Substring to find"]
+    substring: Annotated[str, "Substring to find"],
+    overlap: Annotated[bool, "Include overlapping occurrences"] = True
 ) -> list[int]:
-    """Find all starting indices where a substring appears (includes overlaps)."""
+    """Find all starting indices where a substring appears (includes overlaps by default)."""
     if not substring:
         raise ValueError("substring cannot be empty")
-    
+
+    # Single characters skip the substring matcher's setup cost; overlap
+    # cannot matter at length one
+    if len(substring) == 1:
+        return find_all_char_indices(text, substring)
+
     indices = []
+    append = indices.append
     start = 0
-    
+    step = 1 if overlap else len(substring)
+
     while True:
         index = text.find(substring, start)
         if index == -1:
             break
-        indices.append(index)
-        start = index + 1
-    
+        append(index)
+        start = index + step
+
     return indices
 
 
+@mcp.tool()
+def find_all_multi(
+    text: Annotated[str, "Text to search in"],
+    patterns: Annotated[list[str], "Substrings to find"]
+) -> dict:
+    """Find all starting indices for multiple substrings in one pass. Returns {pattern: [indices]} dict."""
+    if not patterns:
+        raise ValueError("patterns cannot be empty")
+    if any(not p for p in patterns):
+        raise ValueError("patterns cannot contain empty strings")
+
+    results = {pattern: [] for pattern in patterns}
+
+    if ahocorasick is not None:
+        # Single Aho-Corasick sweep over the text instead of one scan per pattern.
+        automaton = _build_automaton(tuple(sorted(results)))
+        for end_index, pattern in automaton.iter(text):
+            results[pattern].append(end_index - len(pattern) + 1)
+    else:
+        for pattern in results:
+            results[pattern] = find_all_substring_indices(text, pattern)
+
+    return results
+
+
 # ========================================
 # 2. Splitting (1)
 # ========================================
@@ -122,24 +292,32 @@ def split_at_indices(
     """Split text at exact index positions. Indices auto-sorted and deduplicated."""
     if not indices:
         return [text]
-    
-    # Sort and remove duplicates
-    sorted_indices = sorted(set(indices))
-    
-    # Validate
-    for idx in sorted_indices:
-        if idx < 0 or idx > len(text):
-            raise ValueError(f"Index {idx} out of bounds [0, {len(text)}]")
-    
-    result = []
+
+    sorted_indices = sorted(indices)
+    text_len = len(text)
+
+    # Sorted, so only the extremes can be out of bounds
+    if sorted_indices[0] < 0 or sorted_indices[-1] > text_len:
+        bad = sorted_indices[0] if sorted_indices[0] < 0 else sorted_indices[-1]
+        raise ValueError(f"Index {bad} out of bounds [0, {text_len}]")
+
+    # Sorted, so duplicates are adjacent; drop them in one scan instead
+    # of building a set
+    unique = [sorted_indices[0]]
+    for idx in sorted_indices[1:]:
+        if idx != unique[-1]:
+            unique.append(idx)
+
+    # Preallocate: one piece per split index, plus the tail
+    result = [None] * (len(unique) + 1)
     start = 0
-    
-    for idx in sorted_indices:
-        result.append(text[start:idx])
+
+    for k, idx in enumerate(unique):
+        result[k] = text[start:idx]
         start = idx
-    
-    result.append(text[start:])
-    
+
+    result[-1] = text[start:]
+
     return result
 
 
@@ -156,8 +334,16 @@ def insert_at_index(
     """Insert text at index position without replacing. Supports negative indices."""
     if index < 0:
         index = max(0, len(text) + index + 1)
-    
-    return text[:index] + insertion + text[index:]
+
+    # Prepend/append skip the empty-slice concat entirely
+    if index == 0:
+        return insertion + text
+    if index >= len(text):
+        return text + insertion
+
+    # join sizes the result buffer once instead of allocating an
+    # intermediate string per concatenation.
+    return "".join((text[:index], insertion, text[index:]))
 
 
 @mcp.tool()
@@ -167,7 +353,7 @@ def delete_range(
     end: Annotated[int, "Ending index (exclusive)"]
 ) -> str:
     """Delete characters in range [start, end)."""
-    return text[:start] + text[end:]
+    return "".join((text[:start], text[end:]))
 
 
 @mcp.tool()
@@ -178,11 +364,11 @@ def replace_range(
     replacement: Annotated[str, "Text to replace with"]
 ) -> str:
     """Replace characters in range [start, end) with new text."""
-    return text[:start] + replacement + text[end:]
+    return "".join((text[:start], replacement, text[end:]))
 
 
 # ========================================
-# 4. Utilities (3)
+# 4. Utilities (5)
 # ========================================
 
 @mcp.tool()
@@ -190,19 +376,71 @@ def find_regex_matches(
     text: Annotated[str, "Text to search in"],
     pattern: Annotated[str, "Regular expression pattern"]
 ) -> list[dict]:
-    """Find all regex matches with positions. Returns list of {start, end, match} dicts."""
+    """Find all regex matches with positions. Returns list of {start, end, match} dicts.
+
+    Matching keeps Python re semantics; only simple patterns with no
+    engine-dependent constructs run on the optional RE2 engine (see README).
+    """
+    try:
+        regex = _compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regex pattern: {e}")
+
+    # Results cross the MCP boundary as JSON objects, so plain dicts are
+    # the wire format here; record types would be serialized back to
+    # dicts anyway.
+    return [
+        {"start": match.start(), "end": match.end(), "match": match.group()}
+        for match in regex.finditer(text)
+    ]
+
+
+@mcp.tool()
+def find_regex_strings(
+    text: Annotated[str, "Text to search in"],
+    pattern: Annotated[str, "Regular expression pattern"]
+) -> list:
+    """Find all regex matches, returning only the matched strings (re.findall semantics: capture groups return the groups).
+
+    Matching keeps Python re semantics; only simple patterns with no
+    engine-dependent constructs run on the optional RE2 engine (see README).
+    """
+    try:
+        regex = _compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regex pattern: {e}")
+
+    return regex.findall(text)
+
+
+@mcp.tool()
+def find_regex_spans(
+    text: Annotated[str, "Text to search in"],
+    pattern: Annotated[str, "Regular expression pattern"]
+) -> list[tuple[int, int]]:
+    """Find all regex matches, returning only [start, end) position pairs.
+
+    Matching keeps Python re semantics; only simple patterns with no
+    engine-dependent constructs run on the optional RE2 engine (see README).
+    """
     try:
-        matches = []
-        for match in re.finditer(pattern, text):
-            matches.append({
-                "start": match.start(),
-                "end": match.end(),
-                "match": match.group()
-            })
-        return matches
+        regex = _compile(pattern)
     except re.error as e:
         raise ValueError(f"Invalid regex pattern: {e}")
 
+    return [match.span() for match in regex.finditer(text)]
+
+
+# Template for extract_between_markers results when no match exists;
+# returned as a copy so callers never share state.
+_NOT_FOUND = {
+    "content": None,
+    "content_start": None,
+    "content_end": None,
+    "full_start": None,
+    "full_end": None
+}
+
 
 @mcp.tool()
 def extract_between_markers(
@@ -217,32 +455,43 @@ def extract_between_markers(
     if occurrence < 1:
         raise ValueError("occurrence must be >= 1")
     
+    # Fast path for the overwhelmingly common first-occurrence case:
+    # two find calls, no loop bookkeeping
+    if occurrence == 1:
+        start_idx = text.find(start_marker)
+        if start_idx == -1:
+            return dict(_NOT_FOUND)
+
+        content_start = start_idx + len(start_marker)
+        end_idx = text.find(end_marker, content_start)
+
+        if end_idx == -1:
+            return dict(_NOT_FOUND)
+
+        return {
+            "content": text[content_start:end_idx],
+            "content_start": content_start,
+            "content_end": end_idx,
+            "full_start": start_idx,
+            "full_end": end_idx + len(end_marker)
+        }
+
     count = 0
     search_start = 0
-    
+    start_len = len(start_marker)
+    end_len = len(end_marker)
+
     while True:
         start_idx = text.find(start_marker, search_start)
         if start_idx == -1:
-            return {
-                "content": None,
-                "content_start": None,
-                "content_end": None,
-                "full_start": None,
-                "full_end": None
-            }
-        
-        content_start = start_idx + len(start_marker)
+            return dict(_NOT_FOUND)
+
+        content_start = start_idx + start_len
         end_idx = text.find(end_marker, content_start)
-        
+
         if end_idx == -1:
-            return {
-                "content": None,
-                "content_start": None,
-                "content_end": None,
-                "full_start": None,
-                "full_end": None
-            }
-        
+            return dict(_NOT_FOUND)
+
         count += 1
         if count == occurrence:
             return {
@@ -250,61 +499,105 @@ def extract_between_markers(
                 "content_start": content_start,
                 "content_end": end_idx,
                 "full_start": start_idx,
-                "full_end": end_idx + len(end_marker)
+                "full_end": end_idx + end_len
             }
-        
+
         search_start = content_start
 
 
+def _char_stats(text: str) -> dict:
+    """Shared implementation behind count_chars and count_chars_many."""
+    if text.isascii():
+        buf = text.encode("ascii")
+
+        if _count_ascii is not None:
+            whitespace, letters, digits, special, plain_spaces = (
+                int(v) for v in _count_ascii(np.frombuffer(buf, dtype=np.uint8))
+            )
+        else:
+            # Tag every byte with its class in one translate pass, then
+            # tally each class with a C-level count.
+            tagged = buf.translate(_ASCII_CLASS_TABLE)
+            whitespace = tagged.count(_CLASS_WS)
+            letters = tagged.count(_CLASS_LETTER)
+            digits = tagged.count(_CLASS_DIGIT)
+            special = len(buf) - whitespace - letters - digits
+            plain_spaces = buf.count(b" ")
+
+        return {
+            "total": len(text),
+            "without_spaces": len(text) - plain_spaces,
+            "letters": letters,
+            "digits": digits,
+            "spaces": whitespace,
+            "special": special
+        }
+
+    # One C-level pass over the text; classification then runs per unique
+    # character, which is bounded by the alphabet rather than the text length.
+    counts = Counter(text)
+    tallies = Counter()
+    for char, count in counts.items():
+        tallies[_classify(char)] += count
+
+    return {
+        "total": len(text),
+        "without_spaces": len(text) - counts[" "],
+        "letters": tallies[_CLASS_LETTER],
+        "digits": tallies[_CLASS_DIGIT],
+        "spaces": tallies[_CLASS_WS],
+        "special": tallies[_CLASS_OTHER]
+    }
+
+
 @mcp.tool()
 def count_chars(
     text: Annotated[str, "Text to analyze"]
 ) -> dict:
     """Count character statistics. Returns dict with total, without_spaces, letters, digits, spaces, special."""
-    return {
-        "total": len(text),
-        "without_spaces": len(text.replace(" ", "")),
-        "letters": sum(1 for c in text if c.isalpha()),
-        "digits": sum(1 for c in text if c.isdigit()),
-        "spaces": sum(1 for c in text if c.isspace()),
-        "special": sum(1 for c in text if not c.isalnum() and not c.isspace())
-    }
+    return _char_stats(text)
 
 
 # ========================================
-# 5. Batch Processing (1) - 핵심 통합
+# 5. Batch Processing (2) - 핵심 통합
 # ========================================
 
+@mcp.tool()
+def count_chars_many(
+    texts: Annotated[list[str], "Texts to analyze"]
+) -> list[dict]:
+    """Count character statistics for multiple texts in one call. Returns one count_chars dict per text."""
+    return [_char_stats(text) for text in texts]
+
+
 @mcp.tool()
 def extract_substrings(
     text: Annotated[str, "Text to extract from"],
     ranges: Annotated[list[dict], "List of ranges with 'start' (required) and 'end' (optional). Negative indices supported"]
 ) -> list[dict]:
     """Extract substrings by index ranges. Supports negative indices and omitting end. Returns list of {start, end, substring, length} dicts."""
-    results = []
     text_len = len(text)
-    
-    for r in ranges:
-        start = r["start"]
-        end = r.get("end", None)
-        
-        # Normalize negative indices
-        if start < 0:
-            start = max(0, text_len + start)
-        if end is not None and end < 0:
-            end = max(0, text_len + end)
-        
-        # Extract substring
+
+    # Unpack the ranges into parallel start/end lists up front, so the
+    # dict lookups and negative-index normalization run as comprehensions
+    # and the slicing loop only slices. An explicit None end means the
+    # same as an omitted one
+    starts = [r["start"] for r in ranges]
+    ends = [r.get("end") for r in ranges]
+    starts = [max(0, text_len + s) if s < 0 else s for s in starts]
+    ends = [text_len if e is None else max(0, text_len + e) if e < 0 else e for e in ends]
+
+    results = [None] * len(ranges)
+
+    for k, (start, end) in enumerate(zip(starts, ends)):
         substring = text[start:end]
-        actual_end = end if end is not None else text_len
-        
-        results.append({
+        results[k] = {
             "start": start,
-            "end": actual_end,
+            "end": end,
             "substring": substring,
             "length": len(substring)
-        })
-    
+        }
+
     return results
 
 